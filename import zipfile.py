@@ -4,13 +4,45 @@ import zipfile
 import sqlite3
 import shutil
 import re
+import functools
+import itertools
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import orjson                      # optional: much faster parsing of big media maps
+except ImportError:
+    orjson = None
 
 # CONFIGURE PATHS
 DECK_FOLDER = "tones_extracted"        # folder where you extracted the .apkg
 OUTPUT_FOLDER = "xue_output_tones"     # where .xue files will be saved
-MEDIA_FOLDER = os.path.join(OUTPUT_FOLDER, "media")
+SHARD_OUTPUT = False                   # group .xue files into subfolders by first two characters (for huge decks)
+JOB_BATCH = 64                         # cards handed to a worker per task
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-os.makedirs(MEDIA_FOLDER, exist_ok=True)
+# Prefixes for building per-note paths without os.path.join
+_DECK_PREFIX = DECK_FOLDER + os.sep
+_OUT_PREFIX = OUTPUT_FOLDER + os.sep
+
+# XUE METADATA
+# Every card shares the same metadata apart from the pinyin, so serialize it
+# once and split around a placeholder for the pinyin string.
+_PINYIN_PLACEHOLDER = "@PINYIN@"
+XUE_TEMPLATE_PARTS = json.dumps({
+    "schema_version": 2,
+    "english": _PINYIN_PLACEHOLDER,
+    "pinyin": _PINYIN_PLACEHOLDER,
+    "native": _PINYIN_PLACEHOLDER,
+    "tags": ["tone_practice"],
+    "delay_between_instruction_and_native": 2,
+    "stats": {
+        "times_played": 0,
+        "times_correct": 0,
+        "times_incorrect": 0,
+        "last_played": None
+    }
+}, ensure_ascii=False, indent=2).split(json.dumps(_PINYIN_PLACEHOLDER))
 
 # TONE MAP
 tone_map = {
@@ -22,102 +54,201 @@ tone_map = {
     'ü': ['ǖ', 'ǘ', 'ǚ', 'ǜ']
 }
 
+# One translate table per (vowel, tone), built once
+TONE_TABLES = {
+    (vowel, tone): str.maketrans(vowel, marks[tone - 1])
+    for vowel, marks in tone_map.items()
+    for tone in range(5)
+}
+
+@functools.lru_cache(maxsize=None)
 def numbered_to_tone(pinyin_num):
     if not pinyin_num or not pinyin_num[-1].isdigit():
         return pinyin_num
     tone = int(pinyin_num[-1])
     base = pinyin_num[:-1]
+    # Vowel priority (a before e before i ...) decides where the mark goes,
+    # so this can't simply take the first vowel in the syllable
     for vowel in "aeiouü":
         if vowel in base:
-            return base.replace(vowel, tone_map[vowel][tone - 1])
+            return base.translate(TONE_TABLES[vowel, tone])
     return pinyin_num
 
+_HTML_RE = re.compile(r'<[^>]+>')
+_SOUND_RE = re.compile(r'\[sound:([^\]]+)\]')
+_INVALID_RE = re.compile(r'[\\/*?:"<>|]')
+
+@functools.lru_cache(maxsize=None)
 def make_safe_filename(text):
-    text = re.sub(r'<[^>]+>', '', text)     # remove HTML tags
+    text = _HTML_RE.sub('', text)           # remove HTML tags
     text = text.replace("ü", "v")           # convert ü to v
-    return re.sub(r'[\\/*?:"<>|]', "", text) # remove invalid filename chars
-
-# Load media map
-with open(os.path.join(DECK_FOLDER, "media"), "r", encoding="utf-8") as f:
-    media_map = json.load(f)
-
-# Connect to collection DB
-conn = sqlite3.connect(os.path.join(DECK_FOLDER, "collection.anki2"))
-cursor = conn.cursor()
-cursor.execute("SELECT flds FROM notes")
-rows = cursor.fetchall()
-conn.close()
-
-print(f"Found {len(rows)} notes. Starting conversion...\n")
-
-count = 0
-for row in rows:
-    fields = row[0].split("\x1f")
-    if len(fields) < 2:
-        continue
-
-    audio_tag = fields[0]
-    pinyin_raw = fields[1].strip()
-
-    if not pinyin_raw or "]" not in audio_tag:
-        continue
-
+    return _INVALID_RE.sub("", text)        # remove invalid filename chars
+
+# Fixed timestamp for archive entries: nothing is stat'ed, and rebuilding the
+# same deck gives byte-identical .xue files
+XUE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+def _entry_info(name, compress_type):
+    info = zipfile.ZipInfo(name, date_time=XUE_DATE_TIME)
+    info.compress_type = compress_type
+    return info
+
+def xue_relpath(safe_filename):
+    """Path of a card's .xue relative to OUTPUT_FOLDER."""
+    if SHARD_OUTPUT:
+        return f"{safe_filename[:2] or '_'}{os.sep}{safe_filename}.xue"
+    return f"{safe_filename}.xue"
+
+def scan_existing_xue():
+    """Relative paths of every .xue already in OUTPUT_FOLDER (one scandir per folder)."""
+    existing = set()
+    for entry in os.scandir(OUTPUT_FOLDER):
+        if entry.name.endswith(".xue"):
+            existing.add(entry.name)
+        elif SHARD_OUTPUT and entry.is_dir():
+            existing.update(f"{entry.name}{os.sep}{sub.name}" for sub in os.scandir(entry.path)
+                            if sub.name.endswith(".xue"))
+    return existing
+
+def build_xue(job):
+    """Write one .xue archive. Runs in a worker process; returns a status string."""
+    source_mp3, zip_name, pinyin_tone = job
+    zip_path = f"{_OUT_PREFIX}{zip_name}"
+
+    # Fill the pinyin into the prebuilt metadata
+    metadata = json.dumps(pinyin_tone, ensure_ascii=False).join(XUE_TEMPLATE_PARTS)
+
+    # Save as .xue, streaming the MP3 straight from the deck. Write to a .tmp
+    # sibling and rename on success so a crash never leaves a partial .xue
+    # that the next run would treat as already done.
+    tmp_path = zip_path + ".tmp"
     try:
-        filename = audio_tag.split("sound:")[1].split("]")[0]
-    except:
-        continue
-
-    if filename not in media_map.values():
-        continue
-
-    # Tone conversion and safe filename
-    pinyin_tone = numbered_to_tone(pinyin_raw)
-    safe_filename = make_safe_filename(pinyin_raw)
-
-    # Get MP3 source path
-    source_key = next((k for k, v in media_map.items() if v == filename), None)
-    if not source_key:
-        continue
-    source_mp3 = os.path.join(DECK_FOLDER, source_key)
-    dest_mp3 = os.path.join(MEDIA_FOLDER, f"{safe_filename}_native.mp3")
-
-    # Avoid overwriting files
-    if os.path.exists(dest_mp3):
-        print(f"⚠️ Skipping duplicate: {safe_filename}")
-        continue
-
-    try:
-        shutil.copy(source_mp3, dest_mp3)
-    except Exception as e:
-        print(f"❌ Could not copy {source_mp3}: {e}")
-        continue
-
-    # Create xue object
-    xue_obj = {
-        "schema_version": 2,
-        "english": pinyin_tone,
-        "pinyin": pinyin_tone,
-        "native": pinyin_tone,
-        "tags": ["tone_practice"],
-        "delay_between_instruction_and_native": 2,
-        "stats": {
-            "times_played": 0,
-            "times_correct": 0,
-            "times_incorrect": 0,
-            "last_played": None
-        }
-    }
-
-    # Save as .xue
-    zip_path = os.path.join(OUTPUT_FOLDER, f"{safe_filename}.xue")
-    try:
-        with zipfile.ZipFile(zip_path, 'w') as zipf:
-            zipf.writestr("metadata.json", json.dumps(xue_obj, ensure_ascii=False, indent=2))
-            zipf.write(dest_mp3, arcname="native.mp3")
-        count += 1
-        if count % 100 == 0:
-            print(f"Processed {count} cards...")
+        # MP3 is already compressed, so store it; only the JSON is worth deflating
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED) as zipf:
+            zipf.writestr(_entry_info("metadata.json", zipfile.ZIP_DEFLATED), metadata, compresslevel=1)
+            with open(source_mp3, "rb") as src, zipf.open(_entry_info("native.mp3", zipfile.ZIP_STORED), "w") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, zip_path)
     except Exception as e:
         print(f"❌ Could not write {zip_path}: {e}")
-
-print(f"\n✅ Finished! {count} .xue files written to: {OUTPUT_FOLDER}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return "write_failed"
+    return "ok"
+
+def build_xue_batch(jobs):
+    """Build a batch of cards in one worker task; returns their status strings."""
+    return [build_xue(job) for job in jobs]
+
+def collect_jobs(cursor, reverse_media, existing, skipped):
+    """Parse notes and yield (source_mp3, zip_name, pinyin_tone) for each card to build.
+
+    existing is the set of .xue paths already in OUTPUT_FOLDER; paths are added
+    to it as they are claimed so later duplicates in the deck are skipped too.
+    Duplicates are tallied in the skipped Counter rather than printed one by one.
+    """
+    shards = set()
+    for row in cursor:
+        fields = row[0].split("\x1f")
+        if len(fields) < 2:
+            continue
+
+        audio_tag = fields[0]
+        pinyin_raw = fields[1].strip()
+
+        if not pinyin_raw:
+            continue
+
+        match = _SOUND_RE.search(audio_tag)
+        if not match:
+            continue
+        filename = match.group(1)
+
+        source_key = reverse_media.get(filename)
+        if not source_key:
+            continue
+
+        # Tone conversion and safe filename
+        pinyin_tone = numbered_to_tone(pinyin_raw)
+        safe_filename = make_safe_filename(pinyin_raw)
+
+        # Get MP3 source path
+        source_mp3 = f"{_DECK_PREFIX}{source_key}"
+        zip_name = xue_relpath(safe_filename)
+
+        # Avoid overwriting files (including ones queued earlier in this run)
+        if zip_name in existing:
+            skipped["duplicate"] += 1
+            continue
+        existing.add(zip_name)
+
+        # Shard folders are made here so workers never race to create them
+        if SHARD_OUTPUT:
+            shard = os.path.dirname(zip_name)
+            if shard not in shards:
+                os.makedirs(_OUT_PREFIX + shard, exist_ok=True)
+                shards.add(shard)
+
+        yield source_mp3, zip_name, pinyin_tone
+
+if __name__ == "__main__":
+    # Load media map
+    with open(os.path.join(DECK_FOLDER, "media"), "rb") as f:
+        raw_media = f.read()
+    media_map = orjson.loads(raw_media) if orjson else json.loads(raw_media)
+    # Media map is {archive_key: filename}; index it by filename for lookups
+    reverse_media = {v: k for k, v in media_map.items()}
+    del media_map, raw_media
+
+    # Connect to collection DB and stream notes instead of fetching them all
+    conn = sqlite3.connect(os.path.join(DECK_FOLDER, "collection.anki2"))
+    cursor = conn.cursor()
+    cursor.arraysize = 1000
+    # Read-only access, and let SQLite mmap the collection instead of buffered reads
+    cursor.execute("PRAGMA query_only = 1")
+    cursor.execute("PRAGMA mmap_size = 268435456")
+    note_total = cursor.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    print(f"Found {note_total} notes. Starting conversion...\n")
+
+    # One directory scan up front instead of a stat per note
+    existing_xue = scan_existing_xue()
+
+    # Parsing stays in this process so duplicates are resolved in order;
+    # the archive writes are independent and run across all cores.
+    count = 0
+    skipped = Counter()
+    # Notes without a sound tag can never produce a card, so leave them in SQLite
+    cursor.execute("SELECT flds FROM notes WHERE flds LIKE '%[sound:%'")
+    # Only a couple of batches per worker are in flight at once, so notes are
+    # parsed as workers free up and memory stays flat however big the deck is
+    # (executor.map would drain the whole cursor before the first result).
+    workers = os.cpu_count() or 1
+    jobs = collect_jobs(cursor, reverse_media, existing_xue, skipped)
+    pending = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while len(pending) < 2 * workers:
+                batch = list(itertools.islice(jobs, JOB_BATCH))
+                if not batch:
+                    break
+                pending.add(executor.submit(build_xue_batch, batch))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for status in future.result():
+                    if status != "ok":
+                        skipped[status] += 1
+                        continue
+                    count += 1
+                    if count % 1000 == 0:
+                        sys.stderr.write(f"Processed {count} cards...\n")
+
+    conn.close()
+
+    if skipped:
+        print("⚠️ Skipped: " + ", ".join(f"{n} {reason}" for reason, n in skipped.items()))
+    print(f"\n✅ Finished! {count} .xue files written to: {OUTPUT_FOLDER}")
@@ -1,20 +1,48 @@
 import json
+import io
+import sqlite3
 import zipfile
+import mmap
 import os
 import random
+import functools
 import time
 import pygame
 import sys
 from datetime import datetime
 import threading
-import uuid
-import glob
+import queue
+import weakref
+import atexit
+import logging
 import platform
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import orjson                      # optional: faster settings/metadata JSON
+except ImportError:
+    orjson = None
+try:
+    import numpy as np                 # optional: vectorised weighted picks for big libraries
+except ImportError:
+    np = None
+try:
+    import resource                    # Unix only: lets us size the zip handle cap to the fd limit
+except ImportError:
+    resource = None
+try:
+    import lgpio                       # only present on the Raspberry Pi
+except ImportError:
+    lgpio = None
 
 
 
 # ---------------- CONFIG ----------------
 
+DEBUG = False  # log per-play/per-touch detail (log.debug) to the console
+
+log = logging.getLogger("langmachine")
+
 SCREEN_WIDTH = 480
 SCREEN_HEIGHT = 800
 IMAGE_AREA_HEIGHT = 480
@@ -23,15 +51,75 @@ CHINESE_FONT_SIZE = 32
 MENU_FONT_SIZE = 36
 SETTINGS_FONT_SIZE = 32
 
-BACKGROUND_COLOR = (0, 0, 0)
+# Fill colours are pygame.Color so draw calls don't convert tuples each time.
+# Text colours stay tuples: they are part of the (hashable) render cache keys.
+BACKGROUND_COLOR = pygame.Color(0, 0, 0)
 TEXT_COLOR = (255, 255, 255)
+SUBMENU_COLORS = (pygame.Color(70, 130, 180), pygame.Color(50, 205, 50))  # Blue, Green
+BAR_COLOR = pygame.Color(0, 200, 0)
+FLAG_COLOR = pygame.Color(138, 43, 226)     # Dark purple when not flagged
+FLAG_ON_COLOR = pygame.Color(186, 85, 211)  # Light purple when flagged
 
 SETTINGS_FILE = "settings.json"
+SETTINGS_SAVE_DELAY = 0.5  # seconds
+LIBRARY_DB = "library.sqlite"  # LO text, tags, stats and flags; the .xue files hold audio
+RENDER_CACHE_SIZE = 1024   # rendered text surfaces kept between frames
+VECTORIZE_MIN_LOS = 64     # use the NumPy weighted picker above this many LOs
+FPS = 30  # GUI redraw rate
+FACE_UPDATE_INTERVAL_NS = 200_000_000  # 0.2 s between idle-face animation checks
+
+# Screen regions presented separately by draw()
+FACE_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, IMAGE_AREA_HEIGHT)
+PANEL_RECT = pygame.Rect(0, IMAGE_AREA_HEIGHT, SCREEN_WIDTH, SCREEN_HEIGHT - IMAGE_AREA_HEIGHT)
+BAR_RECT = pygame.Rect(0, IMAGE_AREA_HEIGHT - 5, SCREEN_WIDTH, 10)  # countdown bar
+
+AUDIO_END_EVENT = pygame.USEREVENT + 1
+VOICE_CHANNEL = 0  # mixer channel reserved for LO audio
+# .xue archives kept mapped between plays; the rest are reopened per play.
+# Each mapping holds a file descriptor (mmap dups it), so stay well inside the
+# fd limit (1024 by default on the Pi) next to SQLite, audio, fonts and GPIO.
+MAX_OPEN_ZIPS = 256
+if resource is not None:
+    MAX_OPEN_ZIPS = min(MAX_OPEN_ZIPS, resource.getrlimit(resource.RLIMIT_NOFILE)[0] // 4)
+AUDIO_CACHE_SIZE = 64  # LOs whose audio bytes are kept in memory per session
+STATS_BATCH_MAX = 16  # played LOs written per stats transaction
+STATS_BATCH_WAIT = 0.5  # seconds the stats writer waits to fill a batch
+GPIO_EVENT = pygame.USEREVENT + 2
+
+# Quadrature decode: index is (previous AB << 2) | new AB, value is the step
+# (+1 right, -1 left, 0 for no change or an invalid double transition)
+ROTARY_STEPS = (0, -1, 1, 0, 1, 0, 0, -1, -1, 0, 0, 1, 0, 1, -1, 0)
+
+FACE_FILES = {
+    "default": "smiley.png",
+    "smile_teeth": "smile_teeth.png",
+    "neutral": "neutral.png",
+    "concerned": "concerned.png",
+    "frown": "frown.png",
+    "frown_eyes_closed": "frown_closed.png",
+    "frown_tear": "frown_tear.png",
+    "look_left": "look_left.png",
+    "look_right": "look_right.png",
+    "disturbed": "disturbed.png",
+}
+
+def load_face_image(path):
+    return pygame.transform.scale(pygame.image.load(path), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT))
+
+def flatten_face(surf):
+    face = pygame.Surface(surf.get_size()).convert()
+    face.fill(BACKGROUND_COLOR)
+    face.blit(surf, (0, 0))
+    return face
 
 # ---------------- LEARNING OBJECT ----------------
 
 class LearningObjectV2:
     CURRENT_SCHEMA_VERSION = 2
+    # Thousands of these are kept in memory; slots drop the per-instance dict
+    __slots__ = ("schema_version", "english", "pinyin", "native", "tags",
+                 "delay_between_instruction_and_native", "flagged", "language",
+                 "stats", "file_path", "_zip")
     def __init__(self, english, pinyin, native, tags, delay_between_instruction_and_native=6, stats=None, flagged=False, language="chinese"):
         self.schema_version = self.CURRENT_SCHEMA_VERSION
         self.english = english
@@ -47,9 +135,37 @@ class LearningObjectV2:
             "times_incorrect": 0,
             "last_played": None
         }
+        self.file_path = None
+        self._zip = None
+    def adopt_zip(self, zipf):
+        with _open_zips_lock:
+            if len(_open_zips) >= MAX_OPEN_ZIPS:
+                return False
+            self._zip = zipf
+            _open_zips.add(zipf)
+        return True
+    def read_audio(self):
+        # One mapped archive per LO, opened on first audio access and kept for
+        # replays while under MAX_OPEN_ZIPS; past the cap it is closed again
+        zipf = self._zip
+        keep = zipf is not None
+        if not keep:
+            zipf = open_xue(self.file_path)
+            keep = self.adopt_zip(zipf)
+        try:
+            return (load_audio_bytes(zipf, 'instruction.mp3'), load_audio_bytes(zipf, 'native.mp3'))
+        finally:
+            if not keep:
+                zipf.close()
     def record_play(self):
         self.stats["times_played"] += 1
-        self.stats["last_played"] = datetime.now().isoformat()
+        # Kept as an epoch float in memory; to_dict() writes the ISO string
+        self.stats["last_played"] = time.time()
+    def stats_for_save(self):
+        last_played = self.stats.get("last_played")
+        if isinstance(last_played, float):
+            return dict(self.stats, last_played=datetime.fromtimestamp(last_played).isoformat())
+        return self.stats
     def to_dict(self):
         return {
             "schema_version": self.schema_version,
@@ -57,7 +173,7 @@ class LearningObjectV2:
             "pinyin": self.pinyin,
             "native": self.native,
             "tags": self.tags,
-            "stats": self.stats,
+            "stats": self.stats_for_save(),
             "flagged": self.flagged
         }
     @staticmethod
@@ -77,90 +193,337 @@ class LearningObjectV2:
         )
 # ---------------- FILE HANDLING ----------------
 
+_open_zips = weakref.WeakSet()  # ZipFile handles held by LOs, closed on exit
+_open_zips_lock = threading.Lock()  # LOs are loaded from a thread pool
+
+def close_open_zips():
+    for zipf in list(_open_zips):
+        zipf.close()
+    _open_zips.clear()
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def json_dumps(obj):
+    # Returns UTF-8 bytes, indented like the files have always been
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+def write_file_atomic(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+class _MappedFile(mmap.mmap):
+    # ZipFile wants seekable(), which mmap only grew in Python 3.13
+    def seekable(self):
+        return True
+
+def open_xue(path):
+    # Map the archive and read it through the mapping: member reads are
+    # memory copies from the page cache rather than a seek + read each.
+    # mmap keeps its own dup of the descriptor, so each open archive still
+    # costs one fd until the ZipFile (the mapping's only holder) is closed
+    # and dropped.
+    with open(path, "rb") as f:
+        mm = _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return zipfile.ZipFile(mm)
+
 def load_learning_object(zip_path):
-    with zipfile.ZipFile(zip_path, 'r') as zipf:
-        metadata = json.loads(zipf.read('metadata.json'))
-        lo = LearningObjectV2.from_dict(metadata)
+    zipf = open_xue(zip_path)
+    try:
+        metadata = json_loads(zipf.read('metadata.json'))
+    except Exception:
+        zipf.close()
+        raise
+    lo = LearningObjectV2.from_dict(metadata)
+    lo.file_path = zip_path
+    # Keep the handle (and its parsed central directory) for audio reads later,
+    # up to a cap so big libraries don't run out of file descriptors
+    if not lo.adopt_zip(zipf):
+        zipf.close()
+    return lo
+
+class MetadataStore:
+    # One SQLite index for every LO, so startup is a single SELECT instead of
+    # a zip open + JSON parse per file, and a stats save is one UPDATE.
+    # A .xue is only opened to import it (new or rebuilt since last seen) and
+    # later to read its audio.
+    COLUMNS = ("file_path", "mtime", "english", "pinyin", "native", "tags", "delay",
+               "flagged", "times_played", "times_correct", "times_incorrect", "last_played")
+
+    def __init__(self, path=LIBRARY_DB):
+        # Written from the GUI thread (flags) and the playback thread (stats)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS lo (file_path TEXT PRIMARY KEY, mtime REAL,"
+            " english TEXT, pinyin TEXT, native TEXT, tags TEXT, delay REAL, flagged INTEGER,"
+            " times_played INTEGER, times_correct INTEGER, times_incorrect INTEGER, last_played TEXT)")
+        self._insert_sql = "INSERT OR REPLACE INTO lo VALUES (%s)" % ", ".join("?" * len(self.COLUMNS))
+
+    @staticmethod
+    def _row_for(lo, mtime):
+        stats = lo.stats_for_save()
+        return (lo.file_path, mtime, lo.english, lo.pinyin, lo.native, json.dumps(lo.tags, ensure_ascii=False),
+                lo.delay_between_instruction_and_native, int(lo.flagged),
+                stats.get("times_played", 0), stats.get("times_correct", 0),
+                stats.get("times_incorrect", 0), stats.get("last_played"))
+
+    @staticmethod
+    def _from_row(row):
+        (file_path, _, english, pinyin, native, tags, delay, flagged,
+         played, correct, incorrect, last_played) = row
+        lo = LearningObjectV2(english, pinyin, native, json_loads(tags), delay, {
+            "times_played": played,
+            "times_correct": correct,
+            "times_incorrect": incorrect,
+            "last_played": last_played
+        }, bool(flagged))
+        lo.file_path = file_path
         return lo
 
-def update_learning_object_metadata(zip_path, lo):
-    # Create a new zip file in memory with updated metadata
-    temp_zip_path = zip_path + ".temp"
-    with zipfile.ZipFile(zip_path, 'r') as old_zip:
-        with zipfile.ZipFile(temp_zip_path, 'w') as new_zip:
-            for item in old_zip.infolist():
-                if item.filename != 'metadata.json':
-                    new_zip.writestr(item, old_zip.read(item.filename))
-            # Write the updated metadata.json
-            metadata = json.dumps(lo.to_dict(), indent=2)
-            new_zip.writestr('metadata.json', metadata)
-    os.replace(temp_zip_path, zip_path)
-
-
-def extract_audio_from_zip(zip_path, filename, extract_to):
-    os.makedirs(extract_to, exist_ok=True)
-    with zipfile.ZipFile(zip_path, 'r') as zipf:
-        unique_name = f"{uuid.uuid4().hex}_{filename}"
-        full_path = os.path.join(extract_to, unique_name)
-        with open(full_path, 'wb') as f:
-            f.write(zipf.read(filename))
-        return full_path  # just the path is fine for deletion later
-    
-def safe_delete(path, retries=5, delay=0.05):
-    for _ in range(retries):
-        try:
-            os.remove(path)
-            return
-        except PermissionError:
-            time.sleep(delay)
-    print(f"Failed to delete {path} after retries.")
-
-def clean_temp_folder(exclude_files):
-    """Delete all .mp3 files in the temp folder except those in exclude_files."""
-    count = 0
-    for f in glob.glob("temp/*.mp3"):
-        count = count + 1
-        #print(str(count))
-        if f not in exclude_files:
-            try:
-                os.remove(f)
-            except Exception as e:
-                print(f"Could not delete {f}: {e}")
-    count = 0
-    for f in glob.glob("temp/*.wav"):
-        count = count + 1
-        print(str(count))
-        if f not in exclude_files:
-            try:
-                os.remove(f)
-            except Exception as e:
-                print(f"Could not delete {f}: {e}")
+    def load_folder(self, folder):
+        with os.scandir(folder) as entries:
+            mtimes = {entry.path: entry.stat().st_mtime for entry in entries if entry.name.endswith(".xue")}
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM lo").fetchall()
+        known = {row[0]: row for row in rows if row[0] in mtimes}
+        los = {}
+        stale = []
+        for path, mtime in mtimes.items():
+            row = known.get(path)
+            if row is not None and row[1] == mtime:
+                los[path] = self._from_row(row)
+            else:
+                stale.append(path)
+        if stale:
+            # Opening the zips is I/O-latency bound, so overlap the reads
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                imported = list(executor.map(load_learning_object, stale))
+            for lo in imported:
+                row = known.get(lo.file_path)
+                if row is not None:
+                    # Rebuilt .xue: take its text, keep what was learned so far
+                    old = self._from_row(row)
+                    lo.stats, lo.flagged = old.stats, old.flagged
+                los[lo.file_path] = lo
+            with self._lock, self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(self._insert_sql, [self._row_for(lo, mtimes[lo.file_path]) for lo in imported])
+        return [los[path] for path in mtimes]
+
+    def save(self, los):
+        # Stats and flag are the only fields that change at runtime
+        params = []
+        for lo in los:
+            stats = lo.stats_for_save()
+            params.append((int(lo.flagged), stats.get("times_played", 0), stats.get("times_correct", 0),
+                           stats.get("times_incorrect", 0), stats.get("last_played"), lo.file_path))
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN")  # one commit for the whole batch
+            self.conn.executemany(
+                "UPDATE lo SET flagged=?, times_played=?, times_correct=?, times_incorrect=?,"
+                " last_played=? WHERE file_path=?", params)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def load_audio_bytes(zipf, filename):
+    # Audio is handed to pygame from memory; no temp files to write or clean up
+    if filename not in zipf.NameToInfo:
+        return None
+    return zipf.read(filename)
 
 def safe_exit(app_instance=None):
     if app_instance and app_instance.playback_engine:
         app_instance.playback_engine.stop()
+    if app_instance:
+        app_instance.settings.flush()
     if app_instance and hasattr(app_instance, "on_raspberry_pi") and app_instance.on_raspberry_pi:
         try:
             app_instance.GPIO.cleanup()
         except Exception as e:
-            print(f"GPIO cleanup failed: {e}")
+            log.warning("GPIO cleanup failed: %s", e)
 
+    close_open_zips()
     pygame.quit()
     sys.exit(0)
+# ---------------- TEXT ----------------
+
+@functools.lru_cache(maxsize=512)
+def wrap_text(text, font, max_width):
+    # Fonts live for the whole run, so (text, font, width) is a stable key
+    words = text.split(" ")
+    lines = []
+    current_line = ""
+
+    for word in words:
+        test_line = current_line + (" " if current_line else "") + word
+        if font.size(test_line)[0] <= max_width:
+            current_line = test_line
+        else:
+            if current_line:
+                lines.append(current_line)
+            current_line = word
+
+    if current_line:
+        lines.append(current_line)
+
+    return tuple(lines)
+
+OUTLINE_THICKNESS = 2  # Change this to 3 or more for thicker borders
+OUTLINE_OFFSETS = tuple(
+    (dx, dy)
+    for dx in range(-OUTLINE_THICKNESS, OUTLINE_THICKNESS + 1)
+    for dy in range(-OUTLINE_THICKNESS, OUTLINE_THICKNESS + 1)
+    if not (dx == 0 and dy == 0)
+)
+
+class GlyphAtlas:
+    # Per-font glyph cache. Lines in the CJK font are assembled from glyphs
+    # rendered once each, so a new LO only costs SDL_ttf for characters it
+    # has never seen rather than a shape+rasterise of the whole line.
+    def __init__(self, font):
+        self.font = font
+        self.glyphs = {}  # (char, color) -> surface
+
+    def glyph(self, ch, color):
+        surf = self.glyphs.get((ch, color))
+        if surf is None:
+            surf = self.glyphs[(ch, color)] = self.font.render(ch, True, color).convert_alpha()
+        return surf
+
+    def render(self, text, color):
+        blits = []
+        x = 0
+        for ch in text:
+            g = self.glyph(ch, color)
+            blits.append((g, (x, 0)))
+            x += g.get_width()
+        surface = pygame.Surface((max(x, 1), self.font.get_height()), pygame.SRCALPHA)
+        surface.blits(blits, doreturn=False)
+        return surface.convert_alpha()
+
+_glyph_atlases = {}  # font -> GlyphAtlas
+
+def use_glyph_atlas(font):
+    _glyph_atlases[font] = GlyphAtlas(font)
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def render_text(font, text, color):
+    # Labels repeat every frame; rasterise each (font, text, colour) once.
+    # Surfaces are in display format, so call clear_text_caches() if fonts are
+    # reloaded or the display mode is ever re-created.
+    atlas = _glyph_atlases.get(font)
+    if atlas:
+        return atlas.render(text, color)
+    return font.render(text, True, color).convert_alpha()
+
+def outline_layer(font, text, text_color, outline_color, vectorized=None):
+    # The outline on its own: the text stamped at every OUTLINE_OFFSETS
+    # position on a transparent surface, with the text sitting at (t, t)
+    if vectorized is None:
+        vectorized = np is not None
+    base_surface = render_text(font, text, text_color)
+    w, h = base_surface.get_size()
+    t = OUTLINE_THICKNESS
+    surface = pygame.Surface((w + 2 * t, h + 2 * t), pygame.SRCALPHA)
+    if vectorized:
+        # Same result as the blits below, done on the alpha mask with array
+        # ops: each stamp composites alpha as a + b - a * b // 255, exactly
+        # what pygame does blitting SRCALPHA onto SRCALPHA, in the same order
+        alpha = pygame.surfarray.array_alpha(base_surface).astype(np.int32)
+        acc = np.zeros((w + 2 * t, h + 2 * t), dtype=np.int32)
+        for dx, dy in OUTLINE_OFFSETS:
+            window = acc[t + dx:t + dx + w, t + dy:t + dy + h]
+            window += alpha - window * alpha // 255
+        surface.fill(outline_color)
+        surface_alpha = pygame.surfarray.pixels_alpha(surface)
+        surface_alpha[:] = acc
+        del surface_alpha  # unlock the surface
+    else:
+        outline_surface = render_text(font, text, outline_color)
+        for dx, dy in OUTLINE_OFFSETS:
+            surface.blit(outline_surface, (t + dx, t + dy))
+    return surface
+
+@functools.lru_cache(maxsize=RENDER_CACHE_SIZE)
+def outlined_text(font, text, text_color, outline_color):
+    # Bake the outline and the text into one surface so drawing it is one blit
+    surface = outline_layer(font, text, text_color, outline_color)
+    surface.blit(render_text(font, text, text_color), (OUTLINE_THICKNESS, OUTLINE_THICKNESS))
+    return surface.convert_alpha()
+
+def clear_text_caches():
+    outlined_text.cache_clear()
+    render_text.cache_clear()
+    wrap_text.cache_clear()
+    for atlas in _glyph_atlases.values():
+        atlas.glyphs.clear()
+
 # ---------------- PICKERS ----------------
 
 def random_picker(learning_objects):
     return random.choice(learning_objects)
 
-def weighted_picker(learning_objects):
-    weights = []
-    for lo in learning_objects:
-        stats = lo.stats
-        weight = (stats["times_incorrect"] + 1) / (stats["times_played"] + 1)
-        weights.append(weight)
-    total = sum(weights)
-    normalized = [w / total for w in weights]
-    return random.choices(learning_objects, weights=normalized, k=1)[0]
+def lo_weight(lo):
+    stats = lo.stats
+    return (stats["times_incorrect"] + 1) / (stats["times_played"] + 1)
+
+class WeightedPicker:
+    # Efraimidis-Spirakis (A-Res) draw: each LO gets key u ** (1 / w) and the
+    # largest key wins, which picks with probability proportional to w.
+    # Weights are cached and only the LO picked last time (whose stats
+    # record_play just changed) is recomputed.
+    def __init__(self, learning_objects):
+        self.objs = learning_objects
+        self.weights = [1.0 / lo_weight(lo) for lo in learning_objects]
+        self.last = None
+
+    def __call__(self, _):
+        if self.last is not None:
+            self.weights[self.last] = 1.0 / lo_weight(self.objs[self.last])
+        rand = random.random
+        best_key = -1.0
+        best = 0
+        for i, inv_w in enumerate(self.weights):
+            key = rand() ** inv_w
+            if key > best_key:
+                best_key = key
+                best = i
+        self.last = best
+        return self.objs[best]
+
+class VectorizedWeightedPicker:
+    # Weighted pick on NumPy columns for large libraries, where the per-LO
+    # Python loop dominates. Draws from a cumulative-weight array with a
+    # binary search; only the row picked last time is refreshed, then the
+    # cumulative sum is rebuilt in one pass.
+    def __init__(self, learning_objects):
+        self.objs = learning_objects
+        n = len(learning_objects)
+        self._weights = np.empty(n)
+        for i, lo in enumerate(learning_objects):
+            self._weights[i] = lo_weight(lo)
+        self._cumw = np.cumsum(self._weights)
+        self._rng = np.random.default_rng()
+        self.last = None
+
+    def __call__(self, _):
+        if self.last is not None:
+            self._weights[self.last] = lo_weight(self.objs[self.last])
+            np.cumsum(self._weights, out=self._cumw)
+        target = self._rng.random() * self._cumw[-1]
+        i = int(np.searchsorted(self._cumw, target, side="right"))
+        self.last = min(i, len(self.objs) - 1)  # guard the float edge at the top
+        return self.objs[self.last]
 
 class SequentialPicker:
     def __init__(self, learning_objects):
@@ -183,19 +546,41 @@ class SettingsManager:
             "show_native": True,
             "seconds_per_char": 1.0
         }
+        # Changes are written SAVE_DELAY seconds after the last one, so a run of
+        # taps costs one write; flush() writes immediately (and runs at exit)
+        self._dirty = False
+        self._flush_timer = None
+        self.version = 0  # bumped on every change so views know to rebuild
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
         self.load()
 
     def load(self):
         if os.path.exists(SETTINGS_FILE):
-            with open(SETTINGS_FILE, "r") as f:
-                self.data = json.load(f)
+            with open(SETTINGS_FILE, "rb") as f:
+                self.data = json_loads(f.read())
         else:
             self.data = self.defaults.copy()
             self.save()
 
     def save(self):
-        with open(SETTINGS_FILE, "w") as f:
-            json.dump(self.data, f, indent=2)
+        with self._lock:
+            self.version += 1
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(SETTINGS_SAVE_DELAY, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            write_file_atomic(SETTINGS_FILE, json_dumps(self.data))
 
     def cycle_picker(self):
         modes = ["Random", "Weighted", "Sequential"]
@@ -217,120 +602,196 @@ class SettingsManager:
 # ---------------- ENGINE ----------------
 
 class PlaybackEngine:
-    def __init__(self, learning_objects, picker_function, settings, gui_callback, mode="normal"):
+    def __init__(self, learning_objects, picker_function, settings, gui_callback, store, mode="normal"):
         self.learning_objects = learning_objects
+        self.store = store
         self.picker_function = picker_function
         self.settings = settings
         self.gui_callback = gui_callback
         self.current_lo = None
-        self.paused = False
-        self.stopped = False
-        self.skip_requested = False
         self.mode = mode
-        
-    def pause(self): self.paused = True
-    def resume(self): self.paused = False
-    def stop(self): self.stopped = True
-    def skip(self): self.skip_requested = True
+        # The playback thread sleeps on _wake; every control call and the
+        # audio-end event set it, so waits cost nothing until something happens
+        self._resume = threading.Event()
+        self._resume.set()
+        self._skip = threading.Event()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self.channel = pygame.mixer.Channel(VOICE_CHANNEL)
+        self._audio_cache = OrderedDict()  # file_path -> (instruction, native) mp3 bytes
+        # Stats are written by a background thread so saving never delays
+        # the next LO; None on the queue tells it to finish up
+        self._write_q = queue.Queue()
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    @property
+    def paused(self): return not self._resume.is_set()
+    @property
+    def stopped(self): return self._stop.is_set()
+    @property
+    def skip_requested(self): return self._skip.is_set()
+
+    def pause(self):
+        self._resume.clear()
+        self._wake.set()
+    def resume(self):
+        self._resume.set()
+        self._wake.set()
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+    def skip(self):
+        self._skip.set()
+        self._wake.set()
+    def on_audio_end(self):
+        # Called from the GUI thread when it receives AUDIO_END_EVENT
+        self._wake.set()
+
+    def load_audio(self, lo):
+        # Recently played LOs keep their (compressed) audio in memory, so a
+        # repeat play doesn't go back to the zip at all
+        audio = self._audio_cache.get(lo.file_path)
+        if audio is not None:
+            self._audio_cache.move_to_end(lo.file_path)
+            return audio
+        audio = lo.read_audio()
+        self._audio_cache[lo.file_path] = audio
+        if len(self._audio_cache) > AUDIO_CACHE_SIZE:
+            self._audio_cache.popitem(last=False)
+        return audio
+
+    def play_audio(self, audio):
+        # LO audio is decoded straight from memory and played on our own channel
+        self.channel.play(pygame.mixer.Sound(file=io.BytesIO(audio)))
 
     def play_loop(self):
         while not self.stopped:
+            self._wake.clear()
             if not self.paused:
                 self.current_lo = self.picker_function(self.learning_objects)
                 self.current_lo.record_play()
 
-                print(f"Now playing: {self.current_lo.english}")  # Debug line
+                log.debug("Now playing: %s", self.current_lo.english)
                 #self.gui_callback(self.current_lo, 0.0, "learning","english")
 
-                self.skip_requested = False
+                self._skip.clear()
                 self.play_learning_object(self.current_lo)
 
-                update_learning_object_metadata(self.current_lo.file_path, self.current_lo)
+                self._write_q.put(self.current_lo)
             else:
-                time.sleep(0.1)
-
-
-    def wait_with_pause(self, duration):
-        start = time.time()
-        while time.time() - start < duration:
+                self._wake.wait()
+        self._write_q.put(None)
+        self._writer.join()
+
+    def _writer_loop(self):
+        done = False
+        while not done:
+            batch = {self._write_q.get()}
+            deadline = time.monotonic() + STATS_BATCH_WAIT
+            while None not in batch and len(batch) < STATS_BATCH_MAX:
+                try:
+                    batch.add(self._write_q.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch.discard(None)
+                done = True
+            if batch:
+                try:
+                    self.store.save(batch)
+                except sqlite3.Error as e:
+                    log.warning("Saving stats failed: %s", e)
+
+    def wait_for_audio(self):
+        # Block until the current track finishes. The end event only wakes us;
+        # get_busy() confirms it, since stopping a track also posts the event.
+        # The 1 s timeout is a fallback in case an end event is missed.
+        audio_paused = False
+        while True:
+            self._wake.clear()
             if self.skip_requested or self.stopped:
-                pygame.mixer.music.stop()
+                self.channel.stop()
                 return False
-            while self.paused:
-                pygame.mixer.music.pause()
-                time.sleep(0.1)
-            pygame.mixer.music.unpause()
-            time.sleep(0.05)
-        return True
-    
-    def wait_with_progress(self, total_duration, lo, mode):
-        elapsed = 0
-        step = 0.05  # GUI update interval
-
-        while elapsed < total_duration:
+            if self.paused != audio_paused:
+                audio_paused = self.paused
+                if audio_paused:
+                    self.channel.pause()
+                else:
+                    self.channel.unpause()
+            elif not audio_paused and not self.channel.get_busy():
+                return True
+            self._wake.wait(1.0)
+
+    def wait_with_pause(self, duration, on_step=None, step=None):
+        # Sleep for duration seconds of unpaused time, returning early (False)
+        # on skip/stop. on_step(elapsed) is called every step seconds if given.
+        elapsed = 0.0
+        while elapsed < duration:
+            self._wake.clear()
             if self.skip_requested or self.stopped:
-                pygame.mixer.music.stop()
+                self.channel.stop()
                 return False
+            if self.paused:
+                self.channel.pause()
+                self._wake.wait()
+                self.channel.unpause()
+                continue
+
+            start = time.monotonic()
+            self._wake.wait(min(step or duration, duration - elapsed))
+            elapsed += time.monotonic() - start
+            if on_step:
+                on_step(min(elapsed, duration))
+        return True
 
-            while self.paused:
-                pygame.mixer.music.pause()
-                time.sleep(0.1)
-
-            pygame.mixer.music.unpause()
-
-            time.sleep(step)
-            elapsed += step
-
+    def wait_with_progress(self, total_duration, lo, mode):
+        # Wake once per pixel the bar moves, but never more often than every
+        # 50 ms; short countdowns jump a few pixels per report instead
+        step = max(total_duration / SCREEN_WIDTH, 0.05)
+        last_width = None
+
+        def report(elapsed):
+            # Only tell the GUI when the bar would move by at least a pixel
+            nonlocal last_width
             progress = 1.0 - (elapsed / total_duration)
-            self.gui_callback(lo, progress, mode, self.current_lang)
+            width = int(SCREEN_WIDTH * progress)
+            if width != last_width:
+                last_width = width
+                self.gui_callback(lo, progress, mode, self.current_lang)
 
-        return True
+        return self.wait_with_pause(total_duration, report, step)
 
     def play_learning_object(self, lo):
-        try:
-            instr_path = extract_audio_from_zip(lo.file_path, 'instruction.mp3', 'temp')
-            has_instr_audio = True
-        except KeyError:
-            instr_path = None
-            has_instr_audio = False
-
-        native_path = extract_audio_from_zip(lo.file_path, 'native.mp3', 'temp')
+        instr_audio, native_audio = self.load_audio(lo)
 
         # Decide dynamic order
         if self.mode == "chinese_first":
-            first_audio = native_path
-            second_audio = instr_path if has_instr_audio else None
+            first_audio = native_audio
+            second_audio = instr_audio
             first_lang = "native"
             second_lang = "english"
-            print("Made it to chinese block")
+            log.debug("Made it to chinese block")
         else:
-            first_audio = instr_path if has_instr_audio else None
-            second_audio = native_path
+            first_audio = instr_audio
+            second_audio = native_audio
             first_lang = "english"
             second_lang = "native"
-            print("Made it to English block")
+            log.debug("Made it to English block")
 
         try:
             # Phase 1 — Instruction
             self.state = "learning"
             self.current_progress = 0.0
             self.current_lang = first_lang  # <== NEW
-            print(f"Now showing: {first_lang} -> {second_lang}")
-            print(f"self.current_lang = {self.current_lang}, self.state = {self.state}")
+            log.debug("Now showing: %s -> %s", first_lang, second_lang)
+            log.debug("self.current_lang = %s, self.state = %s", self.current_lang, self.state)
             if first_audio:
-                pygame.mixer.music.load(first_audio)
-                pygame.mixer.music.play()
+                self.play_audio(first_audio)
                 if hasattr(self.gui_callback, "__self__"):  # Access the LanguageAppliance instance
                     self.gui_callback.__self__.blink_leds_alternate()
-                while pygame.mixer.music.get_busy():
-                    if self.skip_requested or self.stopped:
-                        pygame.mixer.music.stop()
-                        return
-                    while self.paused:
-                        pygame.mixer.music.pause()
-                        time.sleep(0.1)
-                    pygame.mixer.music.unpause()
-                    time.sleep(0.1)
+                if not self.wait_for_audio():
+                    return
 
             if self.mode == "pinyin":
                 delay = self.settings.data["instruction_delay"]
@@ -348,38 +809,20 @@ class PlaybackEngine:
             self.state = "reviewing"
             self.current_lang = second_lang  # <== NEW
             self.current_progress = 0.0
-            print(f"Now showing: {first_lang} -> {second_lang}")
-            print(f"self.current_lang = {self.current_lang}, self.state = {self.state}")
+            log.debug("Now showing: %s -> %s", first_lang, second_lang)
+            log.debug("self.current_lang = %s, self.state = %s", self.current_lang, self.state)
 
             if second_audio:
-                pygame.mixer.music.load(second_audio)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    if self.skip_requested or self.stopped:
-                        pygame.mixer.music.stop()
-                        return
-                    while self.paused:
-                        pygame.mixer.music.pause()
-                        time.sleep(0.1)
-                    pygame.mixer.music.unpause()
-                    time.sleep(0.1)
+                self.play_audio(second_audio)
+                if not self.wait_for_audio():
+                    return
 
             self.wait_with_progress(self.settings.data["quiz_interval"], lo, "reviewing")
             if hasattr(self.gui_callback, "__self__"):
                 self.gui_callback.__self__.current_face = "smile_teeth"
 
         finally:
-            pygame.mixer.music.stop()
-            try:
-                pygame.mixer.music.load(os.devnull)
-            except:
-                pass
-            time.sleep(0.05)
-
-            keep_files = [native_path]
-            if instr_path:
-                keep_files.append(instr_path)
-            clean_temp_folder(keep_files)
+            self.channel.stop()
 
 
 
@@ -390,17 +833,19 @@ class LanguageAppliance:
     def __init__(self):
         self.state = "main_menu"
         self.submenu_scroll = 0
-        self.current_lang = "english"  # default
+        # (lo, progress, lang) shown in learning/reviewing. The playback thread
+        # replaces the whole tuple in one store, so a frame never mixes the
+        # progress of one LO with the text of another.
+        self._snapshot = (None, 0.0, "english")
         self.dragged_during_touch = False
-        self.on_raspberry_pi = platform.system() == "Linux"
+        self.on_raspberry_pi = platform.system() == "Linux" and lgpio is not None
         self.YES_BUTTON_PIN = 5
         self.NO_BUTTON_PIN = 4
         self.ROTARY_A_PIN = 20
         self.ROTARY_B_PIN = 21
         self.YES_LED_PIN = 12
         self.NO_LED_PIN = 26
-        self.prev_yes_state = 1  # Start HIGH (unpressed)
-        self.prev_no_state = 0
+        self.gpio_callbacks = []
 
         self.submenu_buttons = [
             [("English First", self.start_normal_mode)],
@@ -413,20 +858,10 @@ class LanguageAppliance:
             [("Story Mode(Coming soon)", self.placeholder)],
             [("Back to Main Menu", self.go_back_to_main)],
         ]
-        self.face_images = {
-            "default": pygame.transform.scale(pygame.image.load("smiley.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "smile_teeth": pygame.transform.scale(pygame.image.load("smile_teeth.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "neutral": pygame.transform.scale(pygame.image.load("neutral.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "concerned": pygame.transform.scale(pygame.image.load("concerned.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "frown": pygame.transform.scale(pygame.image.load("frown.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "frown_eyes_closed": pygame.transform.scale(pygame.image.load("frown_closed.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "frown_tear": pygame.transform.scale(pygame.image.load("frown_tear.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "look_left": pygame.transform.scale(pygame.image.load("look_left.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "look_right": pygame.transform.scale(pygame.image.load("look_right.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT)),
-            "disturbed": pygame.transform.scale(pygame.image.load("disturbed.png"), (SCREEN_WIDTH, IMAGE_AREA_HEIGHT))
-        }
+        # Submenu rows are fixed, so the scroll range only needs computing once
+        self._max_submenu_scroll = max(0, len(self.submenu_buttons) * 100 - (SCREEN_HEIGHT - IMAGE_AREA_HEIGHT))
+        self.rotary_state = 0  # last rotary AB value; read from the pins below on the Pi
         if self.on_raspberry_pi:
-            import lgpio
             try:
                 self.gpio_chip = lgpio.gpiochip_open(0)
 
@@ -442,25 +877,31 @@ class LanguageAppliance:
                 self.YES_LED_PIN = 12
                 self.NO_LED_PIN = 26
 
-                # Configure pins
+                # Configure pins. Inputs are claimed for edge alerts; lgpio calls
+                # back from its own thread and we forward those as pygame events.
                 for pin in [self.YES_BUTTON_PIN, self.NO_BUTTON_PIN, self.ROTARY_A_PIN, self.ROTARY_B_PIN]:
-                    lgpio.gpio_claim_input(self.gpio_chip, pin)
+                    lgpio.gpio_claim_alert(self.gpio_chip, pin, lgpio.BOTH_EDGES)
+                    self.gpio_callbacks.append(
+                        lgpio.callback(self.gpio_chip, pin, lgpio.BOTH_EDGES, self.on_gpio_alert))
 
                 for pin in [self.YES_LED_PIN, self.NO_LED_PIN]:
                     lgpio.gpio_claim_output(self.gpio_chip, pin)
                     lgpio.gpio_write(self.gpio_chip, pin, 0)  # LEDs off
 
-                # Track last rotary state
-                self.last_rotary_state = lgpio.gpio_read(self.gpio_chip, self.ROTARY_A_PIN)
+                # Track last rotary state as a 2-bit AB value
+                self.rotary_state = (lgpio.gpio_read(self.gpio_chip, self.ROTARY_A_PIN) << 1) \
+                    | lgpio.gpio_read(self.gpio_chip, self.ROTARY_B_PIN)
             except Exception as e:
-                print(f"GPIO setup failed: {e}")
+                log.warning("GPIO setup failed: %s", e)
                 self.on_raspberry_pi = False
+                # Fall back to virtual mode: no alerts may reach handle_gpio
+                for cb in self.gpio_callbacks:
+                    cb.cancel()
+                self.gpio_callbacks.clear()
         else:
-            print("Running in virtual mode (no GPIO)")
-            self.last_rotary_state = 1  # dummy value     
+            log.info("Running in virtual mode (no GPIO)")
         self.current_face = "default"
-        self.face_timer = 0
-        self.last_face_change = time.time()
+        self._next_face_change_ns = 0
 
         self.show_english_line = False
         self.dragging = False
@@ -469,40 +910,63 @@ class LanguageAppliance:
         self.last_scroll_time = time.time()
         pygame.init()
         pygame.mixer.init()
+        pygame.mixer.set_reserved(VOICE_CHANNEL + 1)
+        pygame.mixer.Channel(VOICE_CHANNEL).set_endevent(AUDIO_END_EVENT)
         if platform.system() == "Linux":
             pygame.mouse.set_visible(False)
         else:
             pygame.mouse.set_visible(True)
+        # Plain software display: vsync would need SCALED (a renderer), and
+        # that presents the whole frame on every update, which throws away
+        # the dirty-rect and bar-strip updates in draw()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.NOFRAME)
         pygame.display.set_caption("Language Machine")
         self.font_menu = pygame.font.Font("fonts/ComicNeue-Bold.ttf", MENU_FONT_SIZE)
         self.font_settings = pygame.font.Font("fonts/ComicNeue-Bold.ttf", SETTINGS_FONT_SIZE)
         self.font_chinese = pygame.font.Font("fonts/ZCOOLKuaiLe-Regular.ttf", CHINESE_FONT_SIZE)
+        use_glyph_atlas(self.font_chinese)
 
         self.clock = pygame.time.Clock()
-        self.smiley = pygame.image.load("smiley.png")
-        self.smiley = pygame.transform.scale(self.smiley, (SCREEN_WIDTH, IMAGE_AREA_HEIGHT))
+        self._bg_cache = {}  # state -> prebuilt panel below the face
+        self._settings_bg_version = None
+        # What the screen currently shows; draw() repaints when these change
+        self._drawn_face = None
+        self._drawn_panel = None
+        self._drawn_bar_width = None
+        self._drawn_text_rect = None  # LO text area presented last (may reach above the panel)
+        self._control_tiles = {}  # learning-control button name -> tile surface
+        self._lo_layout_key = None
+        self._lo_layout = []
+        # Decode/scale the faces in parallel, then flatten each onto the
+        # background once: an opaque display-format surface blits as a plain
+        # copy, with no per-pixel format conversion or alpha blending
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            scaled = pool.map(load_face_image, FACE_FILES.values())
+            self.face_images = {name: flatten_face(surf) for name, surf in zip(FACE_FILES, scaled)}
+        self.smiley = self.face_images["default"]
+        # Virtual NO/YES buttons, drawn once (only shown off the Pi)
+        self._debug_overlay = None
+        if not self.on_raspberry_pi:
+            overlay = pygame.Surface((SCREEN_WIDTH, 100), pygame.SRCALPHA)
+            pygame.draw.rect(overlay, (255, 0, 0), (0, 0, 100, 100))  # Virtual NO
+            pygame.draw.rect(overlay, (0, 255, 0), (SCREEN_WIDTH - 100, 0, 100, 100))  # Virtual YES
+            self._debug_overlay = overlay.convert_alpha()
         self.menu_colors = [
-            [(70, 130, 180), (50, 205, 50)],     # Row 0: blue, green
-            [(255, 215, 0), (220, 20, 60)]       # Row 1: gold, red
+            [pygame.Color(70, 130, 180), pygame.Color(50, 205, 50)],     # Row 0: blue, green
+            [pygame.Color(255, 215, 0), pygame.Color(220, 20, 60)]       # Row 1: gold, red
         ]
         self.learning_controls_colors = [
-            (70, 130, 180),  # Pause
-            (255, 215, 0),   # Skip
-            (220, 20, 60),   # Exit
-            (138, 43, 226)   # Flag = BlueViolet
+            pygame.Color(70, 130, 180),  # Pause
+            pygame.Color(255, 215, 0),   # Skip
+            pygame.Color(220, 20, 60),   # Exit
+            FLAG_COLOR                   # Flag = BlueViolet
         ]
 
         self.settings = SettingsManager()
 
-        self.learning_objects = []
-        os.makedirs("temp", exist_ok=True)
-        for file in os.listdir("learning_objects"):
-            if file.endswith(".xue"):
-                path = os.path.join("learning_objects", file)
-                lo = load_learning_object(path)
-                lo.file_path = path
-                self.learning_objects.append(lo)
+        self.store = MetadataStore()
+        self._registry = {}  # folder -> list of LearningObjectV2
+        self.learning_objects = self._get_pool("learning_objects")
 
         self.state = "main_menu"
         self.playback_engine = None
@@ -515,7 +979,6 @@ class LanguageAppliance:
     def blink_leds_alternate(self, times=3, delay=0.15):
         if not self.on_raspberry_pi:
             return  # Skip on PC
-        import lgpio
         for _ in range(times):
             lgpio.gpio_write(self.gpio_chip, self.YES_LED_PIN, 1)
             lgpio.gpio_write(self.gpio_chip, self.NO_LED_PIN, 0)
@@ -529,79 +992,45 @@ class LanguageAppliance:
         lgpio.gpio_write(self.gpio_chip, self.YES_LED_PIN, 0)
         lgpio.gpio_write(self.gpio_chip, self.NO_LED_PIN, 0)
 
-    def wrap_text(self, text, font, max_width):
-        words = text.split(" ")
-        lines = []
-        current_line = ""
-
-        for word in words:
-            test_line = current_line + (" " if current_line else "") + word
-            if font.size(test_line)[0] <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-
-        if current_line:
-            lines.append(current_line)
-
-        return lines
     def go_back_to_main(self):
         self.state = "main_menu"
     def flag_current_object(self):
-        if hasattr(self, 'current_lo') and self.current_lo:
-            self.current_lo.flagged = not self.current_lo.flagged
-            update_learning_object_metadata(self.current_lo.file_path, self.current_lo)
-            print(f"{'Flagged' if self.current_lo.flagged else 'Unflagged'}: {self.current_lo.english}")
+        lo = self.current_lo
+        if lo:
+            lo.flagged = not lo.flagged
+            self.store.save([lo])
+            log.debug("%s: %s", "Flagged" if lo.flagged else "Unflagged", lo.english)
+
+    def _get_pool(self, folder):
+        # Each folder is loaded once; modes share the resident LOs, and
+        # play/flag updates mutate them in place, so nothing needs reloading
+        pool = self._registry.get(folder)
+        if pool is None:
+            pool = self._registry[folder] = self.store.load_folder(folder)
+        return pool
 
     def start_normal_mode(self):
-        self.learning_objects = []
-        for file in os.listdir("learning_objects"):
-            if file.endswith(".xue"):
-                path = os.path.join("learning_objects", file)
-                lo = load_learning_object(path)
-                lo.file_path = path
-                self.learning_objects.append(lo)
+        self.learning_objects = self._get_pool("learning_objects")
         self.launch_learning()
     def start_chinese_first_mode(self):
-        self.learning_objects = []
-        for file in os.listdir("learning_objects"):
-            if file.endswith(".xue"):
-                path = os.path.join("learning_objects", file)
-                lo = load_learning_object(path)
-                lo.file_path = path
-                self.learning_objects.append(lo)
+        self.learning_objects = self._get_pool("learning_objects")
         self.launch_learning(mode="chinese_first")
 
     def start_pinyin_mode(self):
-        self.learning_objects = []
-        for file in os.listdir("pinyin_practice"):
-            if file.endswith(".xue"):
-                path = os.path.join("pinyin_practice", file)
-                lo = load_learning_object(path)
-                lo.file_path = path
-                self.learning_objects.append(lo)
+        self.learning_objects = self._get_pool("pinyin_practice")
         self.launch_learning()
     def start_focused_learning_mode(self):
-        self.learning_objects = []
-        for file in os.listdir("learning_objects"):
-            if file.endswith(".xue"):
-                path = os.path.join("learning_objects", file)
-                lo = load_learning_object(path)
-                lo.file_path = path
-                if lo.flagged:
-                    self.learning_objects.append(lo)
+        self.learning_objects = [lo for lo in self._get_pool("learning_objects") if lo.flagged]
 
         if not self.learning_objects:
-            print("No flagged learning objects found.")
+            log.info("No flagged learning objects found.")
             return
 
         self.launch_learning(mode="focused")
 
     def launch_learning(self, mode="normal"):
         if self.play_thread and self.play_thread.is_alive():
-            print("Warning: learning session already running. Skipping new launch.")
+            log.warning("Learning session already running. Skipping new launch.")
             return
 
         self.playback_engine = PlaybackEngine(
@@ -609,6 +1038,7 @@ class LanguageAppliance:
             self.get_picker(),
             self.settings,
             self.on_new_learning_object,
+            self.store,
             mode=mode
         )
 
@@ -620,36 +1050,35 @@ class LanguageAppliance:
     def run(self):
         running = True
         while running:
-            self.clock.tick(30)
-            scroll_limit = max(0, len(self.submenu_buttons) * 100 - (SCREEN_HEIGHT - IMAGE_AREA_HEIGHT))
-            scrolling_enabled = scroll_limit > 0
+            self.clock.tick(FPS)
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.quit()
                     running = False
+                elif event.type == AUDIO_END_EVENT:
+                    if self.playback_engine:
+                        self.playback_engine.on_audio_end()
+                elif event.type == GPIO_EVENT:
+                    self.handle_gpio(event.pin, event.level)
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.invalidate_display()
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     self.dragging = True
                     self.last_drag_y = event.pos[1]
                     self.dragged_during_touch = False  # Reset on touch start
 
-                elif event.type == pygame.MOUSEMOTION and self.dragging and scrolling_enabled:
+                elif event.type == pygame.MOUSEMOTION and self.dragging and self._max_submenu_scroll > 0:
                     now = time.time()
                     dy = self.last_drag_y - event.pos[1]
                     self.last_drag_y = event.pos[1]
                     self.submenu_scroll += dy
                     self.dragged_during_touch = True  # Register that a drag occurred
 
-                    # Clamp the scroll area
-                    max_scroll = max(0, len(self.submenu_buttons) * 100 - (SCREEN_HEIGHT - IMAGE_AREA_HEIGHT))
-                    #self.submenu_scroll = max(0, min(self.submenu_scroll, max_scroll))
-
                     # Calculate velocity for inertia
                     dt = now - self.last_scroll_time
                     if dt > 0:
                         self.scroll_velocity = dy / dt
                         self.last_scroll_time = now
-                    #if abs(self.scroll_velocity) < 5:
-                    #    self.scroll_velocity = 0
                 elif event.type == pygame.MOUSEBUTTONUP:
                     if not self.dragged_during_touch:
                         # This was a tap, not a scroll — handle it!
@@ -660,73 +1089,70 @@ class LanguageAppliance:
                     self.dragging = False
                     self.scroll_velocity = 0
 
-
-
-                        
-
-            if not self.dragging and abs(self.scroll_velocity) > 0.1:
-                now = time.time()
-                dt = now - self.last_scroll_time
-                self.last_scroll_time = now
-
-                # Apply velocity
-                self.submenu_scroll += self.scroll_velocity * dt
-
-                # Clamp the scroll area
-                max_scroll = max(0, len(self.submenu_buttons) * 100 - (SCREEN_HEIGHT - IMAGE_AREA_HEIGHT))
-                self.submenu_scroll = max(0, min(self.submenu_scroll, max_scroll))
-
-                # Apply deceleration
-                self.scroll_velocity *= 0.75  # smaller = faster deceleration
-            # BOUNCE-BACK CORRECTION
-            max_scroll = max(0, len(self.submenu_buttons) * 100 - (SCREEN_HEIGHT - IMAGE_AREA_HEIGHT))
-            bounce_force = 0.2  # how hard it snaps back
-            damping = 0.7       # how much it slows the bounce
-
-            # If too far up
-            if self.submenu_scroll < 0:
-                self.scroll_velocity += (-self.submenu_scroll) * bounce_force
-                self.scroll_velocity *= damping
-
-            # If too far down
-            elif self.submenu_scroll > max_scroll:
-                self.scroll_velocity += (max_scroll - self.submenu_scroll) * bounce_force
-                self.scroll_velocity *= damping
-
-            # Check buttons
-            if self.on_raspberry_pi:
-                import lgpio
-                # Yes button
-                yes_state = lgpio.gpio_read(self.gpio_chip, self.YES_BUTTON_PIN)
-                if yes_state == 0 and self.prev_yes_state == 1:
-                    print("Yes button pressed")
-                    lgpio.gpio_write(self.gpio_chip, self.YES_LED_PIN, 1)
-                elif yes_state == 1 and self.prev_yes_state == 0:
-                    lgpio.gpio_write(self.gpio_chip, self.YES_LED_PIN, 0)
-
-                self.prev_yes_state = yes_state
-
-                no_state = lgpio.gpio_read(self.gpio_chip, self.NO_BUTTON_PIN)
-                if no_state == 0 and self.prev_no_state == 1:
-                    print("No button pressed")
-                    lgpio.gpio_write(self.gpio_chip, self.NO_LED_PIN, 1)
-                elif no_state == 1 and self.prev_no_state == 0:
-                    lgpio.gpio_write(self.gpio_chip, self.NO_LED_PIN, 0)
-
-                self.prev_no_state = no_state
-
-                # Rotary encoder
-                rotary_a = lgpio.gpio_read(self.gpio_chip, self.ROTARY_A_PIN)
-                rotary_b = lgpio.gpio_read(self.gpio_chip, self.ROTARY_B_PIN)
-                if rotary_a != self.last_rotary_state:
-                    if rotary_b != rotary_a:
-                        print("Rotated right")
-                    else:
-                        print("Rotated left")
-                    self.last_rotary_state = rotary_a
+            # Inertia and bounce-back only matter while the submenu is showing
+            if self.state == "submenu":
+                self.update_submenu_scroll()
+            self.update_face(time.monotonic_ns())
 
             self.draw()
         pygame.quit()
+    def update_submenu_scroll(self):
+        max_scroll = self._max_submenu_scroll
+        if not self.dragging and abs(self.scroll_velocity) > 0.1:
+            now = time.time()
+            dt = now - self.last_scroll_time
+            self.last_scroll_time = now
+
+            # Apply velocity, clamped to the scroll area
+            self.submenu_scroll += self.scroll_velocity * dt
+            self.submenu_scroll = max(0, min(self.submenu_scroll, max_scroll))
+
+            # Apply deceleration
+            self.scroll_velocity *= 0.75  # smaller = faster deceleration
+
+        # BOUNCE-BACK CORRECTION
+        bounce_force = 0.2  # how hard it snaps back
+        damping = 0.7       # how much it slows the bounce
+
+        # If too far up
+        if self.submenu_scroll < 0:
+            self.scroll_velocity += (-self.submenu_scroll) * bounce_force
+            self.scroll_velocity *= damping
+
+        # If too far down
+        elif self.submenu_scroll > max_scroll:
+            self.scroll_velocity += (max_scroll - self.submenu_scroll) * bounce_force
+            self.scroll_velocity *= damping
+
+    def on_gpio_alert(self, chip, pin, level, tick):
+        # Runs on lgpio's callback thread; level 2 is a watchdog timeout.
+        # Alerts are claimed before pygame.init() (and outlive pygame.quit()),
+        # and posting without an initialised pygame raises, so drop those edges.
+        if level != 2 and pygame.get_init():
+            pygame.event.post(pygame.event.Event(GPIO_EVENT, pin=pin, level=level))
+
+    def handle_gpio(self, pin, level):
+        if not self.on_raspberry_pi:
+            return  # an alert queued before GPIO setup fell back to virtual mode
+        if pin == self.YES_BUTTON_PIN:
+            if level == 0:
+                log.debug("Yes button pressed")
+            lgpio.gpio_write(self.gpio_chip, self.YES_LED_PIN, 1 - level)
+        elif pin == self.NO_BUTTON_PIN:
+            if level == 0:
+                log.debug("No button pressed")
+            lgpio.gpio_write(self.gpio_chip, self.NO_LED_PIN, 1 - level)
+        else:
+            # Rotary encoder
+            if pin == self.ROTARY_A_PIN:
+                new_state = (level << 1) | (self.rotary_state & 1)
+            else:
+                new_state = (self.rotary_state & 2) | level
+            step = ROTARY_STEPS[(self.rotary_state << 2) | new_state]
+            self.rotary_state = new_state
+            if pin == self.ROTARY_A_PIN and step:
+                log.debug("Rotated %s", "right" if step > 0 else "left")
+
     def handle_submenu_touch(self, x, y):
         scroll_y = y + self.submenu_scroll - IMAGE_AREA_HEIGHT
         button_height = 100
@@ -743,9 +1169,9 @@ class LanguageAppliance:
         # Virtual button zones (top left and top right corners)
         if not self.on_raspberry_pi and y < 100:
             if x < 100:
-                print("Virtual NO button pressed")
+                log.debug("Virtual NO button pressed")
             elif x > SCREEN_WIDTH - 100:
-                print("Virtual YES button pressed")
+                log.debug("Virtual YES button pressed")
         if self.state == "main_menu" and y >= IMAGE_AREA_HEIGHT:
             col = x // (SCREEN_WIDTH // 2)
             row = (y - IMAGE_AREA_HEIGHT) // ((SCREEN_HEIGHT - IMAGE_AREA_HEIGHT) // 2)
@@ -788,7 +1214,6 @@ class LanguageAppliance:
             elif col == 2:
                 self.playback_engine.resume()
                 self.playback_engine.stop()
-                clean_temp_folder("temp")
                 if self.play_thread:
                     self.play_thread.join()
                 self.state = "main_menu"
@@ -804,161 +1229,274 @@ class LanguageAppliance:
     def get_picker(self):
         mode = self.settings.data["picker_mode"]
         if mode == "Random": return random_picker
-        elif mode == "Weighted": return weighted_picker
+        elif mode == "Weighted":
+            if np is not None and len(self.learning_objects) > VECTORIZE_MIN_LOS:
+                return VectorizedWeightedPicker(self.learning_objects)
+            return WeightedPicker(self.learning_objects)
         elif mode == "Sequential": return SequentialPicker(self.learning_objects)
         else: return random_picker
 
     def on_new_learning_object(self, lo, progress=0, mode="learning", lang="english"):
-        self.current_lo = lo
-        self.current_progress = progress
+        self._snapshot = (lo, progress, lang)
         self.state = mode
-        self.current_lang = lang
         self.show_english_line = False
 
+    @property
+    def current_lo(self): return self._snapshot[0]
+    @property
+    def current_progress(self): return self._snapshot[1]
+    @property
+    def current_lang(self): return self._snapshot[2]
+
 
 
     def placeholder(self):
-        print("Feature not implemented yet")
+        log.info("Feature not implemented yet")
 
     def quit(self):
         if self.playback_engine:
             self.playback_engine.stop()
         if self.play_thread:
             self.play_thread.join()
+        for cb in self.gpio_callbacks:
+            cb.cancel()
+        self.settings.flush()
+        self.store.close()
+        close_open_zips()
 
     def show_settings(self):
         self.state = "settings"
 
+    def panel_key(self, state, snapshot, show_native):
+        # Everything the panel below the face depends on; when it is unchanged
+        # since the last frame that region does not need presenting again
+        if state == "submenu":
+            return (state, int(self.submenu_scroll))
+        if state in ("learning", "reviewing"):
+            lo, _, lang = snapshot
+            return (state, lo, lang, show_native,
+                    self.playback_engine.paused, lo is not None and lo.flagged)
+        if state == "settings":
+            return (state, self.settings.version)
+        return (state,)
+
+    def invalidate_display(self):
+        self._drawn_face = None
+        self._drawn_panel = None
+        self._drawn_bar_width = None
+
     def draw(self):
+        # Read the shared state once; the playback thread may change it mid-frame
+        face = self.current_face
+        state = self.state
+        snapshot = self._snapshot
+        show_native = self.settings.data.get("show_native", True)
+        panel = self.panel_key(state, snapshot, show_native)
+        learning = state in ("learning", "reviewing")
+        bar_width = int(SCREEN_WIDTH * snapshot[1]) if learning else None
+
+        # Frame-diff guard: if nothing shown has changed, skip painting entirely
+        if face == self._drawn_face and panel == self._drawn_panel:
+            if bar_width != self._drawn_bar_width:
+                # Only the countdown moved: repaint and present just the bar strip
+                self.draw_countdown_bar(face, bar_width)
+                self._drawn_bar_width = bar_width
+                pygame.display.update(BAR_RECT)
+            return
+
         self.screen.fill(BACKGROUND_COLOR)
-        self.screen.blit(self.face_images[self.current_face], (0, 0))
-        if self.state == "main_menu":
+        self.screen.blit(self.face_images[face], (0, 0))
+        if state == "main_menu":
             self.draw_menu()
-        elif self.state == "submenu":
+        elif state == "submenu":
             self.draw_submenu()
-        elif self.state in ("learning", "reviewing"):
-            self.draw_learning_object()
-            self.draw_learning_controls()
-        elif self.state == "settings":
+        elif learning:
+            self.draw_learning_object(snapshot, show_native)
+            self.draw_learning_controls(snapshot[0])
+            self.draw_countdown_bar(face, bar_width)
+        elif state == "settings":
             self.draw_settings()
-        # Idle face animation (random look left/right)
-        if self.state not in ("learning", "reviewing"):
-            now = time.time()
-            if now - self.last_face_change > 0.2:  # Check every 3 seconds
-                if random.random() < 0.1:  # 30% chance to change
-                    self.current_face = random.choice(["default", "look_left", "look_right", "neutral"])
-                else:
-                    pass
-                    #self.current_face = "default"
-                self.last_face_change = now
-        elif(self.state == "learning"):
-            # When in learning or reviewing, keep default face
-            
+        if self._debug_overlay:
+            self.screen.blit(self._debug_overlay, (0, 0))
+
+        # Present only the regions that changed since the last frame
+        dirty = []
+        if face != self._drawn_face:
+            dirty.append(FACE_RECT)
+        if panel != self._drawn_panel:
+            dirty.append(PANEL_RECT)
+            dirty.append(BAR_RECT)  # the bar overhangs the face; clear it on state changes
+            # A tall LO layout starts above the panel, so present the text area
+            # too, both where it is now and where the previous one was
+            text_rect = None
+            if learning and self._lo_layout:
+                text_rect = self._lo_layout[0][1].unionall([rect for _, rect in self._lo_layout])
+                dirty.append(text_rect)
+            if self._drawn_text_rect:
+                dirty.append(self._drawn_text_rect)
+            self._drawn_text_rect = text_rect
+        self._drawn_face = face
+        self._drawn_panel = panel
+        self._drawn_bar_width = bar_width
+        pygame.display.update(dirty)
+
+    def draw_countdown_bar(self, face, bar_width):
+        # Restore what is behind the bar (bottom of the face, panel background,
+        # then any LO text that reaches the strip) before filling it, so it
+        # can be redrawn on its own
+        self.screen.fill(BACKGROUND_COLOR, BAR_RECT)
+        self.screen.blit(self.face_images[face], BAR_RECT.topleft, BAR_RECT.clip(FACE_RECT))
+        self.screen.set_clip(BAR_RECT)
+        self.screen.blits(self._lo_layout, doreturn=False)
+        self.screen.set_clip(None)
+        self.screen.fill(BAR_COLOR, (0, BAR_RECT.y, bar_width, BAR_RECT.height))
+
+    def update_face(self, now_ns):
+        # Called from the main loop; draw() only reads current_face
+        if self.state == "learning":
+            # While learning keep the default face (reviewing keeps its smile)
             self.current_face = "default"
-        if not self.on_raspberry_pi:
-            pygame.draw.rect(self.screen, (255, 0, 0), (0, 0, 100, 100))  # Virtual NO
-            pygame.draw.rect(self.screen, (0, 255, 0), (SCREEN_WIDTH - 100, 0, 100, 100))  # Virtual YES
-
-        pygame.display.flip()
+            return
+        if self.state == "reviewing" or now_ns < self._next_face_change_ns:
+            return
+        # Idle face animation (random look left/right), checked every
+        # FACE_UPDATE_INTERVAL_NS rather than on every frame
+        self._next_face_change_ns = now_ns + FACE_UPDATE_INTERVAL_NS
+        if random.random() < 0.1:  # 10% chance to change on each check
+            self.current_face = random.choice(["default", "look_left", "look_right", "neutral"])
 
     def draw_menu(self):
+        bg = self._bg_cache.get("main_menu")
+        if bg is None:
+            bg = self._bg_cache["main_menu"] = self.build_menu_background()
+        self.screen.blit(bg, (0, IMAGE_AREA_HEIGHT))
+
+    def build_menu_background(self):
+        # Tiles and labels never change, so they are painted once
+        bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT - IMAGE_AREA_HEIGHT)).convert()
         button_width = SCREEN_WIDTH // 2
         button_height = (SCREEN_HEIGHT - IMAGE_AREA_HEIGHT) // 2
         for row in range(2):
             for col in range(2):
                 x = col * button_width
-                y = IMAGE_AREA_HEIGHT + row * button_height
+                y = row * button_height
                 color = self.menu_colors[row][col]
-                pygame.draw.rect(self.screen, color, (x, y, button_width, button_height))
+                pygame.draw.rect(bg, color, (x, y, button_width, button_height))
                 label, _ = self.menu_grid[row][col]
-                self.draw_centered_text(self.font_menu, label, x + button_width // 2, y + button_height // 2)
+                self.draw_centered_text(self.font_menu, label, x + button_width // 2, y + button_height // 2, target=bg)
+        return bg
 
     def draw_submenu(self):
-        y_offset = IMAGE_AREA_HEIGHT - self.submenu_scroll
         button_height = 100
 
-        colors = [(70, 130, 180), (50, 205, 50)]  # Blue, Green
-
-        for i, row in enumerate(self.submenu_buttons):
-            label, _ = row[0]
-            color = colors[i % 2]
+        # Only the rows that intersect the panel are drawn
+        scroll = self.submenu_scroll
+        first = max(0, int(scroll // button_height))
+        last = min(len(self.submenu_buttons), int((scroll + PANEL_RECT.height) // button_height) + 1)
+        y_offset = IMAGE_AREA_HEIGHT - scroll + first * button_height
+
+        # Rows scrolled past the top are clipped instead of covering the face,
+        # which is presented separately
+        self.screen.set_clip(PANEL_RECT)
+        for i in range(first, last):
+            label, _ = self.submenu_buttons[i][0]
+            color = SUBMENU_COLORS[i % 2]
             pygame.draw.rect(self.screen, color, (0, y_offset, SCREEN_WIDTH, button_height))
             self.draw_centered_text(self.font_menu, label, SCREEN_WIDTH // 2, y_offset + button_height // 2)
             y_offset += button_height
+        self.screen.set_clip(None)
 
-    def draw_learning_object(self):
-        if not hasattr(self, 'current_lo') or not self.current_lo:
-            return
-
-        lo = self.current_lo
-        #print(getattr(self, 'current_lang'))
-        current_lang = getattr(self, 'current_lang', 'english')
+    def build_learning_object_lines(self, lo, current_lang, show_native):
         lines = []
-        #print(current_lang)
         if current_lang == "native":
             if lo.language == "french":
                 # Treat "pinyin" as the full French sentence
-                french_lines = self.wrap_text(lo.pinyin, self.font_menu, SCREEN_WIDTH - 40)
+                french_lines = wrap_text(lo.pinyin, self.font_menu, SCREEN_WIDTH - 40)
                 lines.extend((line, self.font_menu) for line in french_lines)
             else:
                 # Mandarin case
-                pinyin_lines = self.wrap_text(lo.pinyin, self.font_menu, SCREEN_WIDTH - 40)
+                pinyin_lines = wrap_text(lo.pinyin, self.font_menu, SCREEN_WIDTH - 40)
                 lines.extend((line, self.font_menu) for line in pinyin_lines)
 
-                if self.settings.data.get("show_native", True):
-                    native_lines = self.wrap_text(lo.native, self.font_chinese, SCREEN_WIDTH - 40)
+                if show_native:
+                    native_lines = wrap_text(lo.native, self.font_chinese, SCREEN_WIDTH - 40)
                     lines.extend((line, self.font_chinese) for line in native_lines)
 
-
         elif current_lang == "english":
-            english_lines = self.wrap_text(lo.english, self.font_menu, SCREEN_WIDTH - 40)
+            english_lines = wrap_text(lo.english, self.font_menu, SCREEN_WIDTH - 40)
             lines.extend((line, self.font_menu) for line in english_lines)
+        return lines
 
-        # Draw text lines
+    def layout_learning_object_lines(self, lines):
+        # Pre-render each line and fix its position: [(surface, rect), ...]
         line_height = 50
         total_height = len(lines) * line_height
         start_y = IMAGE_AREA_HEIGHT + (SCREEN_HEIGHT - IMAGE_AREA_HEIGHT - 100 - total_height) // 2
-
+        layout = []
         for i, (line, font) in enumerate(lines):
-            self.draw_centered_text(font, line, SCREEN_WIDTH // 2, start_y + i * line_height)
-
-        # Countdown bar
-        bar_height = 10
-        y_pos = IMAGE_AREA_HEIGHT - bar_height // 2
-        bar_width = int(SCREEN_WIDTH * self.current_progress)
-        pygame.draw.rect(self.screen, (0, 200, 0), (0, y_pos, bar_width, bar_height))
-
-    def draw_learning_controls(self):
-        button_labels = [
-            "Pause" if not self.playback_engine.paused else "Resume",
-            "Skip",
-            "Exit",
-            "Flag"
-        ]
+            surface = outlined_text(font, line, TEXT_COLOR, (0, 0, 0))
+            layout.append((surface, surface.get_rect(center=(SCREEN_WIDTH // 2, start_y + i * line_height))))
+        return layout
+
+    def draw_learning_object(self, snapshot, show_native):
+        lo, _, current_lang = snapshot
+        if not lo:
+            self._lo_layout = []
+            self._lo_layout_key = None
+            return
 
+        # The text layout only changes when the LO, language or setting does
+        key = (lo, current_lang, show_native)
+        if key != self._lo_layout_key:
+            lines = self.build_learning_object_lines(lo, current_lang, show_native)
+            self._lo_layout = self.layout_learning_object_lines(lines)
+            self._lo_layout_key = key
+        self.screen.blits(self._lo_layout, doreturn=False)
+
+    def draw_learning_controls(self, lo):
+        tiles = self._control_tiles
+        if not tiles:
+            tiles.update(self.build_control_tiles())
+        flagged = lo is not None and lo.flagged
+        row = (
+            tiles["resume" if self.playback_engine.paused else "pause"],
+            tiles["skip"],
+            tiles["exit"],
+            tiles["flag_on" if flagged else "flag_off"],
+        )
         button_width = SCREEN_WIDTH // 4
-        button_height = 100
-        y_pos = SCREEN_HEIGHT - button_height  # move to bottom of screen
+        y_pos = SCREEN_HEIGHT - 100  # bottom of screen
+        self.screen.blits([(tile, (i * button_width, y_pos)) for i, tile in enumerate(row)], doreturn=False)
 
-        for i, label in enumerate(button_labels):
-            x = i * button_width
+    def build_control_tiles(self):
+        # One pre-rendered tile per button state; drawing the row is one blits() call
+        button_width = SCREEN_WIDTH // 4
+        button_height = 100
+        specs = {
+            "pause": ("Pause", self.learning_controls_colors[0]),
+            "resume": ("Resume", self.learning_controls_colors[0]),
+            "skip": ("Skip", self.learning_controls_colors[1]),
+            "exit": ("Exit", self.learning_controls_colors[2]),
+            "flag_off": ("Flag", FLAG_COLOR),
+            "flag_on": ("Flag", FLAG_ON_COLOR),
+        }
+        tiles = {}
+        for name, (label, color) in specs.items():
+            tile = pygame.Surface((button_width, button_height)).convert()
+            tile.fill(color)
+            self.draw_centered_text(self.font_menu, label, button_width // 2, button_height // 2, target=tile)
+            tiles[name] = tile
+        return tiles
 
-            if i == 3:  # Flag button
-                if hasattr(self, 'current_lo') and self.current_lo and self.current_lo.flagged:
-                    color = (186, 85, 211)  # Light purple when flagged
-                else:
-                    color = (138, 43, 226)  # Dark purple when not flagged
-            else:
-                color = self.learning_controls_colors[i]
-
-            pygame.draw.rect(self.screen, color, (x, y_pos, button_width, button_height))
-            self.draw_centered_text(
-                self.font_menu,
-                label,
-                x + button_width // 2,
-                y_pos + button_height // 2
-            )
     def draw_settings(self):
+        bg = self._bg_cache.get("settings")
+        if bg is None or self._settings_bg_version != self.settings.version:
+            bg = self._bg_cache["settings"] = self.build_settings_background()
+            self._settings_bg_version = self.settings.version
+        self.screen.blit(bg, (0, IMAGE_AREA_HEIGHT))
+
+    def build_settings_background(self):
+        # Rebuilt only when settings.version shows a setting has changed
         options = [
             f"Picker: {self.settings.data['picker_mode']}",
             f"Instruction Delay: {self.settings.data['instruction_delay']}s",
@@ -966,35 +1504,21 @@ class LanguageAppliance:
             f"Show Characters: {'Yes' if self.settings.data.get('show_native', True) else 'No'}",
             "Back"
         ]
+        bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT - IMAGE_AREA_HEIGHT)).convert()
+        bg.fill(BACKGROUND_COLOR)
         button_height = (SCREEN_HEIGHT - IMAGE_AREA_HEIGHT) // 5
         for i, option in enumerate(options):
-            y = IMAGE_AREA_HEIGHT + i * button_height
-            pygame.draw.rect(self.screen, (0, 0, 0), (0, y, SCREEN_WIDTH, button_height))
-            self.draw_centered_text(self.font_settings, option, SCREEN_WIDTH // 2, y + button_height // 2)
-
-    def draw_centered_text(self, font, text, x, y, text_color=(255, 255, 255), outline_color=(0, 0, 0)):
-        base_surface = font.render(text, True, text_color)
-        outline_surface = font.render(text, True, outline_color)
-        rect = base_surface.get_rect(center=(x, y))
-
-        outline_thickness = 2  # Change this to 3 or more for thicker borders
-        offsets = [
-            (dx, dy)
-            for dx in range(-outline_thickness, outline_thickness + 2)
-            for dy in range(-outline_thickness, outline_thickness + 2)
-            if not (dx == 0 and dy == 0)
-        ]
-
-        for dx, dy in offsets:
-            offset_rect = rect.copy()
-            offset_rect.move_ip(dx, dy)
-            self.screen.blit(outline_surface, offset_rect)
+            y = i * button_height
+            self.draw_centered_text(self.font_settings, option, SCREEN_WIDTH // 2, y + button_height // 2, target=bg)
+        return bg
 
-        # Draw the main text on top
-        self.screen.blit(base_surface, rect)
+    def draw_centered_text(self, font, text, x, y, text_color=(255, 255, 255), outline_color=(0, 0, 0), target=None):
+        surface = outlined_text(font, text, text_color, outline_color)
+        (target or self.screen).blit(surface, surface.get_rect(center=(x, y)))
 
 
 # MAIN ENTRY POINT
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG if DEBUG else logging.INFO, format="%(message)s")
     app = LanguageAppliance()
     app.run()
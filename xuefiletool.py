@@ -2,16 +2,55 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import zipfile
 import json
+import io
+import functools
+import re
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 import pygame
 from datetime import datetime
-
-TEMP_DIR = "temp"
-os.makedirs(TEMP_DIR, exist_ok=True)
-pygame.mixer.init()
+try:
+    import orjson                      # optional: faster metadata JSON, esp. for batch fixes
+except ImportError:
+    orjson = None
+
+COPY_BUFFER_SIZE = 1 << 20  # 1 MiB reads/writes when copying audio into a .xue
+_TAG_RE = re.compile(r"\s*,\s*")  # tag separator, swallowing surrounding spaces
+
+def ensure_mixer():
+    # The audio device is opened on first playback, not at import, so the
+    # batch fix (and its worker processes) never touch it
+    if not pygame.mixer.get_init():
+        pygame.mixer.init()
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+# Returns UTF-8 bytes, indented like the files have always been. The encoder
+# is picked once here rather than on every call.
+if orjson:
+    json_dumps = functools.partial(orjson.dumps, option=orjson.OPT_INDENT_2)
+else:
+    def json_dumps(obj):
+        return json.dumps(obj, indent=2).encode("utf-8")
+
+def copy_file_into_zip(zipf, src_path, arcname):
+    # Stream the file in large chunks rather than through zipf.write()'s small ones
+    info = zipfile.ZipInfo.from_file(src_path, arcname)
+    info.compress_type = zipfile.ZIP_STORED  # MP3/PNG are already compressed
+    with open(src_path, "rb", buffering=COPY_BUFFER_SIZE) as src, zipf.open(info, "w") as dst:
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+def read_xue_member(xue_path, name):
+    with zipfile.ZipFile(xue_path, 'r') as zipf:
+        return zipf.read(name)
 
 class LearningObjectV2:
     CURRENT_SCHEMA_VERSION = 2
+    # Fixed field set, so slots drop the per-instance dict
+    __slots__ = ("schema_version", "english", "pinyin", "native", "tags",
+                 "flagged", "language", "stats")
 
     def __init__(self, english, pinyin, native, tags, stats=None, flagged=False, language="chinese"):
         self.schema_version = self.CURRENT_SCHEMA_VERSION
@@ -59,44 +98,47 @@ class LearningObjectV2:
             flagged=data.get("flagged", False)
         )
 
-def batch_fix_old_files(folder_path):
-    import shutil
-    from tempfile import mkdtemp
-
-    for filename in os.listdir(folder_path):
-        if not filename.endswith(".xue"):
-            continue
+def _fix_one(full_path):
+    """Bring one .xue up to date. Runs in a worker process; returns a status line."""
+    filename = os.path.basename(full_path)
+    tmp_path = full_path + ".tmp"
+    try:
+        with zipfile.ZipFile(full_path, 'r') as zin:
+            metadata = json_loads(zin.read('metadata.json'))
+            # Already migrated: leave the file (and its audio) alone
+            if "delay_between_instruction_and_native" not in metadata and "language" in metadata:
+                return f"⏭️ Up to date: {filename}"
+            # Remove old delay field
+            if "delay_between_instruction_and_native" in metadata:
+                del metadata["delay_between_instruction_and_native"]
+            # Add language field
+            metadata["language"] = "chinese"
+
+            # Stream every entry straight into a new archive next to the old
+            # one; passing the original ZipInfo keeps names and compression
+            with zipfile.ZipFile(tmp_path, 'w') as zout:
+                for info in zin.infolist():
+                    if info.filename == "metadata.json":
+                        zout.writestr(info, json_dumps(metadata))
+                    else:
+                        with zin.open(info) as src, zout.open(info, "w") as dst:
+                            shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+        os.replace(tmp_path, full_path)
+        return f"✅ Fixed: {filename}"
+
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return f"❌ Failed: {filename} — {e}"
 
-        full_path = os.path.join(folder_path, filename)
-        try:
-            with zipfile.ZipFile(full_path, 'r') as zipf:
-                metadata = json.loads(zipf.read('metadata.json'))
-                # Remove old delay field
-                if "delay_between_instruction_and_native" in metadata:
-                    del metadata["delay_between_instruction_and_native"]
-                # Add language field
-                metadata["language"] = "chinese"
-
-                # Extract all files to temp dir
-                temp_dir = mkdtemp()
-                zipf.extractall(temp_dir)
-
-                # Overwrite metadata.json in temp folder
-                with open(os.path.join(temp_dir, "metadata.json"), "w", encoding="utf-8") as f:
-                    json.dump(metadata, f, indent=2)
-
-            # Repack everything from temp_dir into the same .xue file
-            with zipfile.ZipFile(full_path, 'w') as newzip:
-                for root, _, files in os.walk(temp_dir):
-                    for f in files:
-                        arcname = os.path.relpath(os.path.join(root, f), temp_dir)
-                        newzip.write(os.path.join(root, f), arcname)
-
-            shutil.rmtree(temp_dir)
-            print(f"✅ Fixed: {filename}")
-
-        except Exception as e:
-            print(f"❌ Failed: {filename} — {e}")
+def batch_fix_old_files(folder_path):
+    with os.scandir(folder_path) as entries:
+        paths = [entry.path for entry in entries if entry.name.endswith(".xue")]
+    # Files are independent, so rewrite them across all cores
+    with ProcessPoolExecutor() as executor:
+        for result in executor.map(_fix_one, paths, chunksize=4):
+            print(result)
 
 
 class EditorApp:
@@ -108,6 +150,11 @@ class EditorApp:
         self.instruction_path = ""
         self.native_path = ""
         self.image_path = ""
+        # After Open Existing, audio/image stay inside the opened .xue and are
+        # only read when played or re-saved
+        self.source_xue = ""
+        self.native_from_xue = False
+        self.image_from_xue = False
 
         field_names = [
             ("English", "english"),
@@ -151,20 +198,14 @@ class EditorApp:
 
         try:
             with zipfile.ZipFile(path, 'r') as zipf:
-                metadata = json.loads(zipf.read('metadata.json'))
+                metadata = json_loads(zipf.read('metadata.json'))
                 lo = LearningObjectV2.from_dict(metadata)
 
-                #self.instruction_path = os.path.join(TEMP_DIR, "instruction.mp3")
-                self.native_path = os.path.join(TEMP_DIR, "native.mp3")
-                self.image_path = os.path.join(TEMP_DIR, "image.png")
-
-                #zipf.extract("instruction.mp3", TEMP_DIR)
-                zipf.extract("native.mp3", TEMP_DIR)
-
-                if "image.png" in zipf.namelist():
-                    zipf.extract("image.png", TEMP_DIR)
-                else:
-                    self.image_path = ""
+                self.source_xue = path
+                self.native_path = ""
+                self.native_from_xue = "native.mp3" in zipf.NameToInfo
+                self.image_path = ""
+                self.image_from_xue = "image.png" in zipf.NameToInfo
 
             self.fields["english"].delete(0, tk.END)
             self.fields["english"].insert(0, lo.english)
@@ -192,13 +233,16 @@ class EditorApp:
         path = filedialog.askopenfilename(initialdir=initial_dir,title="Select Native Audio", filetypes=[("MP3 Files", "*.mp3")])
         if path:
             self.native_path = path
+            self.native_from_xue = False
 
     def select_image(self):
         path = filedialog.askopenfilename(title="Select Image", filetypes=[("Image Files", "*.png;*.jpg;*.jpeg")])
         if path:
             self.image_path = path
+            self.image_from_xue = False
 
     def play_instruction(self):
+        ensure_mixer()
         if not self.instruction_path or not os.path.exists(self.instruction_path):
             messagebox.showwarning("Warning", "Instruction audio file not selected.")
             return
@@ -206,6 +250,11 @@ class EditorApp:
         pygame.mixer.music.play()
 
     def play_native(self):
+        ensure_mixer()
+        if self.native_from_xue:
+            pygame.mixer.music.load(io.BytesIO(read_xue_member(self.source_xue, "native.mp3")))
+            pygame.mixer.music.play()
+            return
         if not self.native_path or not os.path.exists(self.native_path):
             messagebox.showwarning("Warning", "Native audio file not selected.")
             return
@@ -215,7 +264,7 @@ class EditorApp:
     def save_learning_object(self):
         if not self.instruction_path:
             print("Warning: Instruction audio not selected. File will be saved without it.")
-        if not self.native_path:
+        if not self.native_path and not self.native_from_xue:
             print("Warning: Native audio not selected. File will be saved without it.")
 
 
@@ -223,7 +272,7 @@ class EditorApp:
             english = self.fields["english"].get().strip()
             pinyin = self.fields["pinyin"].get().strip()
             native = self.fields["native"].get().strip()
-            tags = [tag.strip() for tag in self.fields["tags"].get().split(",") if tag.strip()]
+            tags = [tag for tag in _TAG_RE.split(self.fields["tags"].get().strip()) if tag]
 
             lo = LearningObjectV2(
                 english=english,
@@ -245,14 +294,24 @@ class EditorApp:
         if not save_path:
             return
 
-        with zipfile.ZipFile(save_path, 'w') as zipf:
-            zipf.writestr("metadata.json", json.dumps(lo.to_dict(), indent=2))
+        # Read anything kept in the opened .xue first, in case we are saving over it
+        native_bytes = read_xue_member(self.source_xue, "native.mp3") if self.native_from_xue else None
+        image_bytes = read_xue_member(self.source_xue, "image.png") if self.image_from_xue else None
+
+        # Only the metadata is worth deflating; MP3/PNG are already compressed
+        with open(save_path, "wb", buffering=COPY_BUFFER_SIZE) as out, \
+                zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zipf:
+            zipf.writestr("metadata.json", json_dumps(lo.to_dict()))
             if self.instruction_path and os.path.exists(self.instruction_path):
-                zipf.write(self.instruction_path, arcname="instruction.mp3")
-            if self.native_path and os.path.exists(self.native_path):
-                zipf.write(self.native_path, arcname="native.mp3")
-            if self.image_path:
-                zipf.write(self.image_path, arcname="image.png")
+                copy_file_into_zip(zipf, self.instruction_path, "instruction.mp3")
+            if native_bytes is not None:
+                zipf.writestr("native.mp3", native_bytes, compress_type=zipfile.ZIP_STORED)
+            elif self.native_path and os.path.exists(self.native_path):
+                copy_file_into_zip(zipf, self.native_path, "native.mp3")
+            if image_bytes is not None:
+                zipf.writestr("image.png", image_bytes, compress_type=zipfile.ZIP_STORED)
+            elif self.image_path:
+                copy_file_into_zip(zipf, self.image_path, "image.png")
 
 if __name__ == "__main__":
     root = tk.Tk()